@@ -1,4 +1,4 @@
-from .meme import Meme
+from .meme import Meme, seed
 from .network import MemeNetwork
 from .agent import UnifiedMemeticAgent, ThinkingStrategy
 
@@ -7,4 +7,5 @@ __all__ = [
     "MemeNetwork",
     "UnifiedMemeticAgent",
     "ThinkingStrategy",
+    "seed",
 ]
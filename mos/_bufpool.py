@@ -0,0 +1,63 @@
+"""Shape-keyed pool of reusable NumPy scratch buffers.
+
+Buffers come back with whatever the previous user left in them, so callers
+must overwrite them completely.  Each ``(shape, dtype)`` keeps at most
+``MAX_PER_KEY`` buffers and buffers under ``MIN_NBYTES`` are not pooled at
+all: allocating those is cheaper than letting them crowd the pool.  The
+whole pool holds at most ``MAX_TOTAL_NBYTES``; when it would grow past that
+the least recently used shapes are dropped, so a stream of distinct image
+shapes cannot pin memory for the life of the process.
+"""
+
+import threading
+from collections import OrderedDict
+from typing import List, Tuple
+
+import numpy as np
+
+MAX_PER_KEY = 8
+MIN_NBYTES = 4096
+MAX_TOTAL_NBYTES = 32 << 20
+
+_Key = Tuple[Tuple[int, ...], np.dtype]
+
+_lock = threading.Lock()
+# least recently used key first; a key is removed as soon as its list empties
+_pools: "OrderedDict[_Key, List[np.ndarray]]" = OrderedDict()
+_total_nbytes = 0
+
+
+def get(shape: Tuple[int, ...], dtype) -> np.ndarray:
+    """Return an uninitialised array of ``shape``/``dtype``, reusing a pooled one if possible."""
+    global _total_nbytes
+    key = (tuple(shape), np.dtype(dtype))
+    with _lock:
+        pool = _pools.get(key)
+        if pool:
+            arr = pool.pop()
+            _total_nbytes -= arr.nbytes
+            if pool:
+                _pools.move_to_end(key)
+            else:
+                del _pools[key]
+            return arr
+    return np.empty(shape, dtype=dtype)
+
+
+def put(arr: np.ndarray) -> None:
+    """Hand ``arr`` back to the pool; the caller must not use it afterwards."""
+    global _total_nbytes
+    nbytes = arr.nbytes
+    if nbytes < MIN_NBYTES or nbytes > MAX_TOTAL_NBYTES or not arr.flags.c_contiguous:
+        return
+    key = (arr.shape, arr.dtype)
+    with _lock:
+        pool = _pools.setdefault(key, [])
+        if len(pool) >= MAX_PER_KEY:
+            return
+        pool.append(arr)
+        _total_nbytes += nbytes
+        _pools.move_to_end(key)
+        while _total_nbytes > MAX_TOTAL_NBYTES:
+            _, evicted = _pools.popitem(last=False)
+            _total_nbytes -= sum(a.nbytes for a in evicted)
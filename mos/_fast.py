@@ -0,0 +1,60 @@
+"""Optional Numba-compiled kernels.
+
+Numba is only imported, and the kernel only compiled, on the first call to
+:func:`contains_any_kernel`, so ``import mos`` does not pay for it.  The
+kernel is ``None`` when Numba is not installed; callers are expected to fall
+back to a pure Python implementation.
+"""
+
+import importlib.util
+from functools import lru_cache
+from typing import Callable, Iterable, Optional, Tuple
+
+import numpy as np
+
+# checked without importing numba itself
+AVAILABLE = importlib.util.find_spec("numba") is not None
+
+
+def encode_keywords(keywords: Iterable[str]) -> Tuple[np.ndarray, np.ndarray]:
+    """Pack keywords into one UTF-8 byte array plus ``len + 1`` start offsets."""
+    encoded = [kw.encode("utf-8") for kw in keywords]
+    flat = np.frombuffer(b"".join(encoded), dtype=np.uint8)
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(e) for e in encoded])
+    return flat, offsets
+
+
+@lru_cache(maxsize=16)
+def encode_text(text: str) -> np.ndarray:
+    # cached so every strategy checked against the same thought shares one encoding
+    return np.frombuffer(text.encode("utf-8"), dtype=np.uint8)
+
+
+def _contains_any(text: np.ndarray, kws: np.ndarray, offsets: np.ndarray) -> bool:
+    n = text.shape[0]
+    for k in range(offsets.shape[0] - 1):
+        start = offsets[k]
+        m = offsets[k + 1] - start
+        if m == 0:
+            return True
+        first = kws[start]
+        for i in range(n - m + 1):
+            if text[i] != first:
+                continue
+            j = 1
+            while j < m and text[i + j] == kws[start + j]:
+                j += 1
+            if j == m:
+                return True
+    return False
+
+
+@lru_cache(maxsize=None)
+def contains_any_kernel() -> Optional[Callable[[np.ndarray, np.ndarray, np.ndarray], bool]]:
+    """Return the compiled ``contains_any(text, kws, offsets)`` kernel, or ``None``."""
+    try:
+        from numba import njit
+    except ImportError:  # pragma: no cover - optional dependency
+        return None
+    return njit(cache=True, boundscheck=False)(_contains_any)
@@ -1,26 +1,157 @@
+import atexit
 import json
+import logging
+import os
 from datetime import datetime
 import random
+import re
 import threading
-import time
+import types
+import weakref
+from collections import defaultdict
 from pathlib import Path
-from typing import List, Dict, Optional
+from typing import Callable, DefaultDict, Iterable, List, Dict, Mapping, Optional, Sequence, Tuple
+
+from . import _fast
+
+try:
+    import ahocorasick
+except ImportError:  # pragma: no cover - optional dependency
+    ahocorasick = None
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
+# agents whose pending saves are flushed at interpreter exit
+_live_agents: "weakref.WeakSet[UnifiedMemeticAgent]" = weakref.WeakSet()
+
+
+@atexit.register
+def _flush_live_agents() -> None:
+    for agent in list(_live_agents):
+        try:
+            agent.flush()
+        except Exception:
+            logger.exception("failed to save agent state at exit")
+
+
+# a character-class regex beats both chained str.replace and str.translate on
+# the (mostly Cyrillic) thoughts: translate falls off its fast path for non-ASCII
+_PUNCT_RE = re.compile("[" + re.escape(".,;:!?\"'()-—[]{}") + "]")
 
 
 def normalize_text(text: str) -> str:
-    punctuation = ".,;:!?\"'()-—[]{}"
-    for p in punctuation:
-        text = text.replace(p, "")
-    return text.lower()
+    return _PUNCT_RE.sub("", text).lower()
 
 
 def keyword_in_text(text: str, keywords: List[str]) -> bool:
-    norm_text = normalize_text(text)
+    return _keyword_in_norm(normalize_text(text), keywords)
+
+
+def _keyword_in_norm(norm_text: str, keywords: List[str]) -> bool:
+    """Like :func:`keyword_in_text` for text already passed through :func:`normalize_text`."""
     return any(kw in norm_text for kw in keywords)
 
 
+# below this many characters the compiled regex beats the Numba kernel
+_FAST_MIN_CHARS = 1024
+
+
+def _compile_matcher(keywords: Iterable[str]) -> Callable[[str], bool]:
+    """Build a single-pass "does any keyword occur in this normalized text" test."""
+    keywords = list(dict.fromkeys(keywords))
+    if not keywords:
+        return lambda norm_text: False
+    if "" in keywords:
+        return lambda norm_text: True
+    if ahocorasick is not None:
+        automaton = ahocorasick.Automaton()
+        for kw in keywords:
+            automaton.add_word(kw, kw)
+        automaton.make_automaton()
+        return lambda norm_text: any(True for _ in automaton.iter(norm_text))
+    search = re.compile("|".join(map(re.escape, keywords))).search
+    if not _fast.AVAILABLE:
+        return lambda norm_text: search(norm_text) is not None
+    flat, offsets = _fast.encode_keywords(keywords)
+
+    def match(norm_text: str) -> bool:
+        # the regex wins on the short thoughts agents usually see; the
+        # Numba scan only pays off once the text is long
+        if len(norm_text) >= _FAST_MIN_CHARS:
+            kernel = _fast.contains_any_kernel()
+            if kernel is not None:
+                return kernel(_fast.encode_text(norm_text), flat, offsets)
+        return search(norm_text) is not None
+
+    return match
+
+
+def _flush_loop(agent_ref: "weakref.ref[UnifiedMemeticAgent]", dirty: threading.Event, stopped: threading.Event) -> None:
+    # holds the agent only weakly between writes so it can still be collected
+    while not stopped.is_set():
+        dirty.wait()
+        agent = agent_ref()
+        if agent is None:
+            return
+        delay = agent.flush_delay
+        del agent
+        # debounce: let a burst of saves collapse into a single write
+        stopped.wait(delay)
+        agent = agent_ref()
+        if agent is None:
+            return
+        try:
+            agent.flush()
+        except Exception:
+            # the pending state was kept, so the next save retries the write
+            logger.exception("failed to save agent state")
+        del agent
+
+
+def _new_strategy_stats() -> Dict[str, int]:
+    return {"uses": 0, "success": 0, "fail": 0}
+
+
+def _dumps(obj) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(obj, indent=2, ensure_ascii=False).encode("utf-8")
+
+
+def _atomic_write(path: str, data: bytes) -> None:
+    tmp_path = Path(f"{path}.tmp")
+    tmp_path.write_bytes(data)
+    os.replace(tmp_path, path)
+
+
+_CONDITION_KEYS = ("emotions", "goals", "keywords")
+_COMPILED_STRATEGY_ATTRS = frozenset(
+    {
+        "_has_emotions",
+        "_has_goals",
+        "_has_keywords",
+        "_has_triggers",
+        "_emotions",
+        "_goals",
+        "_keyword_matcher",
+        "_trigger_matcher",
+    }
+)
+
+
 class ThinkingStrategy:
-    """Strategy object used by :class:`UnifiedMemeticAgent`."""
+    """Strategy object used by :class:`UnifiedMemeticAgent`.
+
+    ``trigger_topics`` and ``activation_conditions`` are compiled into
+    matchers and are therefore stored immutably (a tuple and a read-only
+    mapping of tuples).  Assign a new value to either attribute to change
+    them; the compiled state is rebuilt on assignment.
+    """
 
     def __init__(
         self,
@@ -38,31 +169,89 @@ class ThinkingStrategy:
         self.activation_conditions = activation_conditions or {}
         self.children = children or []
 
-    def is_applicable(self, emotion: str, goal: str, thought_text: str, energy: int) -> bool:
+    @property
+    def trigger_topics(self) -> Tuple[str, ...]:
+        return self._trigger_topics
+
+    @trigger_topics.setter
+    def trigger_topics(self, topics: Sequence[str]) -> None:
+        self._trigger_topics = tuple(topics)
+        self._has_triggers = bool(self._trigger_topics)
+        self._trigger_matcher = _compile_matcher(self._trigger_topics)
+
+    @property
+    def activation_conditions(self) -> Mapping:
+        return self._activation_conditions
+
+    @activation_conditions.setter
+    def activation_conditions(self, conditions: Mapping) -> None:
+        conditions = {k: tuple(v) if k in _CONDITION_KEYS else v for k, v in conditions.items()}
+        self._activation_conditions = types.MappingProxyType(conditions)
+        # presence of a key matters, not its contents: an empty list rejects everything
+        self._has_emotions = "emotions" in conditions
+        self._has_goals = "goals" in conditions
+        self._has_keywords = "keywords" in conditions
+        self._emotions = frozenset(conditions.get("emotions", ()))
+        self._goals = frozenset(conditions.get("goals", ()))
+        self._keyword_matcher = _compile_matcher(conditions.get("keywords", ()))
+
+    def __getstate__(self) -> Dict:
+        # the compiled matchers are closures and do not pickle; they are rebuilt on load
+        state = {k: v for k, v in self.__dict__.items() if k not in _COMPILED_STRATEGY_ATTRS}
+        state["_activation_conditions"] = dict(self._activation_conditions)
+        return state
+
+    def __setstate__(self, state: Dict) -> None:
+        state = dict(state)
+        trigger_topics = state.pop("_trigger_topics")
+        activation_conditions = state.pop("_activation_conditions")
+        self.__dict__.update(state)
+        self.trigger_topics = trigger_topics
+        self.activation_conditions = activation_conditions
+
+    def is_applicable(self, emotion: str, goal: str, norm_thought: str, energy: int) -> bool:
         if self.level == 1 and energy < 20:
             return False
-        if self.activation_conditions:
-            if "emotions" in self.activation_conditions and emotion not in self.activation_conditions["emotions"]:
-                return False
-            if "goals" in self.activation_conditions and goal not in self.activation_conditions["goals"]:
-                return False
-            if "keywords" in self.activation_conditions:
-                if not keyword_in_text(thought_text, self.activation_conditions["keywords"]):
-                    return False
-        if self.trigger_topics and not keyword_in_text(thought_text, self.trigger_topics):
+        if self._has_emotions and emotion not in self._emotions:
+            return False
+        if self._has_goals and goal not in self._goals:
+            return False
+        if self._has_keywords and not self._keyword_matcher(norm_thought):
+            return False
+        if self._has_triggers and not self._trigger_matcher(norm_thought):
             return False
         return True
 
 
 class UnifiedMemeticAgent:
-    """Simple agent managing memes, memory and thinking strategies."""
+    """Simple agent managing memes, memory and thinking strategies.
+
+    Saves are debounced: :meth:`save_to_file` and :meth:`save_stats` only mark
+    the state dirty and a background thread, started on the first save,
+    writes it out ``flush_delay`` seconds later.  Call :meth:`flush` to write
+    immediately and :meth:`shutdown` to stop the writer thread.  Pending
+    saves are also flushed when the agent is garbage collected and at
+    interpreter exit.
+    """
 
-    def __init__(self, storage_path: str = "mos_memory.json", stats_path: str = "strategy_stats.json"):
+    def __init__(
+        self,
+        storage_path: str = "mos_memory.json",
+        stats_path: str = "strategy_stats.json",
+        flush_delay: float = 0.5,
+    ):
         self.memes: Dict[str, str] = {}
         self.memory: Dict[str, List] = {"goals": [], "thoughts": [], "log": []}
-        self.strategy_stats: Dict[str, Dict[str, int]] = {}
+        self.strategy_stats: DefaultDict[str, Dict[str, int]] = defaultdict(_new_strategy_stats)
         self.storage_path = storage_path
         self.stats_path = stats_path
+        self.flush_delay = flush_delay
+        self._lock = threading.RLock()
+        self._flush_lock = threading.Lock()
+        self._dirty = threading.Event()
+        self._stopped = threading.Event()
+        self._pending: set = set()
+        self._flusher: Optional[threading.Thread] = None
 
         self.auto_thought_pool = [
             "Что бы улучшило текущую цель?",
@@ -81,6 +270,8 @@ class UnifiedMemeticAgent:
         ]
 
         self.thinking = False
+        self._wakeup = threading.Event()
+        self._thinker: Optional[threading.Thread] = None
         self.strategy_tree: List[ThinkingStrategy] = []
         self.state = {
             "emotion": "тревога",
@@ -91,35 +282,52 @@ class UnifiedMemeticAgent:
 
         self.load_from_file()
         self.load_stats()
+        _live_agents.add(self)
+
+    def __del__(self) -> None:
+        stopped = getattr(self, "_stopped", None)
+        if stopped is None:  # __init__ did not get far enough
+            return
+        stopped.set()
+        self._dirty.set()
+        try:
+            self.flush()
+        except Exception:
+            logger.exception("failed to save agent state")
 
     # --- meme manipulation -------------------------------------------------
     def add_meme(self, name: str, content: str) -> None:
-        self.memes[name] = content
-        self.log(f"Мем добавлен: {name}")
+        with self._lock:
+            self.memes[name] = content
+            self.log(f"Мем добавлен: {name}")
         self.save_to_file()
 
     def mutate_meme(self, name: str) -> None:
-        if name in self.memes:
+        with self._lock:
+            if name not in self.memes:
+                return
             self.memes[name] += " (модифицирован)"
             self.log(f"Мем мутировал: {name}")
-            self.save_to_file()
+        self.save_to_file()
 
     def get_meme(self, name: str) -> str:
         return self.memes.get(name, "Мем не найден")
 
     # --- memory ------------------------------------------------------------
     def remember_goal(self, goal: str) -> None:
-        self.memory["goals"].append(goal)
-        self.log(f"Цель добавлена: {goal}")
+        with self._lock:
+            self.memory["goals"].append(goal)
+            self.log(f"Цель добавлена: {goal}")
         self.save_to_file()
 
     def log(self, event: str) -> None:
         timestamp = datetime.now().isoformat()
-        self.memory["log"].append({"time": timestamp, "event": event})
+        with self._lock:
+            self.memory["log"].append({"time": timestamp, "event": event})
 
+    # --- persistence -------------------------------------------------------
     def save_to_file(self) -> None:
-        with open(self.storage_path, "w", encoding="utf-8") as f:
-            json.dump({"memes": self.memes, "memory": self.memory}, f, indent=2, ensure_ascii=False)
+        self._mark_dirty("memory")
 
     def load_from_file(self) -> None:
         if Path(self.storage_path).exists():
@@ -131,37 +339,93 @@ class UnifiedMemeticAgent:
     def load_stats(self) -> None:
         if Path(self.stats_path).exists():
             with open(self.stats_path, "r", encoding="utf-8") as f:
-                self.strategy_stats = json.load(f)
+                self.strategy_stats = defaultdict(_new_strategy_stats, json.load(f))
 
     def save_stats(self) -> None:
-        with open(self.stats_path, "w", encoding="utf-8") as f:
-            json.dump(self.strategy_stats, f, indent=2, ensure_ascii=False)
+        self._mark_dirty("stats")
+
+    def _mark_dirty(self, what: str) -> None:
+        with self._lock:
+            self._pending.add(what)
+            stopped = self._stopped.is_set()
+            if not stopped and self._flusher is None:
+                self._flusher = threading.Thread(
+                    target=_flush_loop,
+                    args=(weakref.ref(self), self._dirty, self._stopped),
+                    daemon=True,
+                )
+                self._flusher.start()
+        if stopped:
+            self.flush()
+        else:
+            self._dirty.set()
+
+    def flush(self) -> None:
+        """Write any pending memory or stats changes to disk now.
+
+        Errors propagate to the caller; whatever could not be written stays
+        pending and is retried by the next flush.
+        """
+        with self._flush_lock:
+            with self._lock:
+                self._dirty.clear()
+                pending, self._pending = self._pending, set()
+            try:
+                for what in ("memory", "stats"):
+                    if what not in pending:
+                        continue
+                    with self._lock:
+                        if what == "memory":
+                            path, data = self.storage_path, _dumps({"memes": self.memes, "memory": self.memory})
+                        else:
+                            path, data = self.stats_path, _dumps(dict(self.strategy_stats))
+                    _atomic_write(path, data)
+                    pending.discard(what)
+            finally:
+                if pending:
+                    with self._lock:
+                        self._pending |= pending
+
+    def shutdown(self) -> None:
+        """Stop periodic thinking and the background writer, then flush."""
+        self.stop_thinking()
+        thinker = self._thinker
+        if thinker is not None and thinker is not threading.current_thread():
+            thinker.join()
+        self._stopped.set()
+        self._dirty.set()
+        if self._flusher is not None:
+            self._flusher.join()
+        _live_agents.discard(self)
+        self.flush()
 
     # --- thinking ----------------------------------------------------------
     def think(self, thought: str) -> Dict:
-        self.memory["thoughts"].append(thought)
-        self.log(f"Мысль: {thought}")
-        self.state["energy"] = max(0, self.state["energy"] - random.randint(1, 3))
-        applicable = self.analyze_thought(thought)
-        results = []
-        for strategy in applicable:
-            name = strategy.name
-            if name not in self.strategy_stats:
-                self.strategy_stats[name] = {"uses": 0, "success": 0, "fail": 0}
-            self.strategy_stats[name]["uses"] += 1
-            result = {
-                "strategy": name,
-                "action": strategy.action_plan,
-                "energy_cost": strategy.level * 2,
-                "triggered_topics": [t for t in strategy.trigger_topics if keyword_in_text(thought, [t])],
-            }
-            self.log(f"Стратегия применена: {name}")
-            success = any(keyword_in_text(thought, [g]) for g in self.memory["goals"])
-            if success:
-                self.strategy_stats[name]["success"] += 1
-            else:
-                self.strategy_stats[name]["fail"] += 1
-            results.append(result)
+        with self._lock:
+            self.memory["thoughts"].append(thought)
+            self.log(f"Мысль: {thought}")
+            self.state["energy"] = max(0, self.state["energy"] - random.randint(1, 3))
+            norm = normalize_text(thought)
+            applicable = self._analyze_normalized(norm)
+            # whether the thought mentions a goal does not depend on the strategy
+            success = _keyword_in_norm(norm, self.memory["goals"])
+            results = []
+            for strategy in applicable:
+                name = strategy.name
+                stats = self.strategy_stats[name]
+                stats["uses"] += 1
+                result = {
+                    "strategy": name,
+                    "action": strategy.action_plan,
+                    "energy_cost": strategy.level * 2,
+                    "triggered_topics": [t for t in strategy.trigger_topics if t in norm],
+                }
+                self.log(f"Стратегия применена: {name}")
+                if success:
+                    stats["success"] += 1
+                else:
+                    stats["fail"] += 1
+                results.append(result)
         self.save_to_file()
         self.save_stats()
         return {
@@ -172,16 +436,20 @@ class UnifiedMemeticAgent:
         }
 
     def analyze_thought(self, thought: str) -> List[ThinkingStrategy]:
-        applicable: List[ThinkingStrategy] = []
+        return self._analyze_normalized(normalize_text(thought))
 
-        def check(strategy: ThinkingStrategy) -> None:
-            if strategy.is_applicable(self.state["emotion"], self.state["current_goal"], thought, self.state["energy"]):
+    def _analyze_normalized(self, norm_thought: str) -> List[ThinkingStrategy]:
+        emotion = self.state["emotion"]
+        goal = self.state["current_goal"]
+        energy = self.state["energy"]
+        applicable: List[ThinkingStrategy] = []
+        # explicit pre-order DFS; children are pushed reversed to keep tree order
+        stack = self.strategy_tree[::-1]
+        while stack:
+            strategy = stack.pop()
+            if strategy.is_applicable(emotion, goal, norm_thought, energy):
                 applicable.append(strategy)
-                for child in strategy.children:
-                    check(child)
-
-        for strategy in self.strategy_tree:
-            check(strategy)
+                stack.extend(reversed(strategy.children))
         return applicable
 
     def build_strategy_hierarchy(self, strategies: List[ThinkingStrategy]) -> None:
@@ -207,11 +475,11 @@ class UnifiedMemeticAgent:
                 original = self.find_strategy_by_name(name)
                 if original:
                     new_name = f"{original.name} v{random.randint(2, 99)}"
-                    new_keywords = original.activation_conditions.get("keywords", []) + ["рост", "обучение"]
+                    new_keywords = list(original.activation_conditions.get("keywords", [])) + ["рост", "обучение"]
                     mutated_strategy = ThinkingStrategy(
                         name=new_name,
                         level=min(original.level + 1, 5),
-                        trigger_topics=original.trigger_topics[:],
+                        trigger_topics=original.trigger_topics,
                         action_plan=original.action_plan + " (эволюционировавший)",
                         activation_conditions={
                             "emotions": list(original.activation_conditions.get("emotions", [])),
@@ -256,13 +524,29 @@ class UnifiedMemeticAgent:
         return self.meta_reflect()
 
     def periodic_thinking(self, interval: int = 10) -> None:
+        """Reflect every ``interval`` seconds until :meth:`stop_thinking`.
+
+        Does nothing if a thinking loop is already running.
+        """
+        thinker = self._thinker
+        if thinker is not None and thinker.is_alive():
+            if self.thinking and not self._wakeup.is_set():
+                return
+            # the previous loop is winding down; let it finish before reusing the event
+            self._wakeup.set()
+            thinker.join()
+        self._wakeup.clear()
+
         def run() -> None:
-            while self.thinking:
+            while self.thinking and not self._wakeup.is_set():
                 self.mixed_reflection()
-                time.sleep(interval)
+                if self._wakeup.wait(interval):
+                    return
 
         self.thinking = True
-        threading.Thread(target=run, daemon=True).start()
+        self._thinker = threading.Thread(target=run, daemon=True)
+        self._thinker.start()
 
     def stop_thinking(self) -> None:
         self.thinking = False
+        self._wakeup.set()
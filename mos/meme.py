@@ -1,12 +1,17 @@
+import copy
+import itertools
 import uuid
 import datetime
 import pickle
+import threading
 import types
-from typing import Any, Dict, Optional
+from typing import Any, Dict, Optional, Tuple, Union
 
 import numpy as np
 from PIL import Image
 
+from . import _bufpool
+
 try:
     import torch
     import torch.nn as nn
@@ -14,30 +19,155 @@ except ImportError:  # pragma: no cover - optional dependency
     torch = None
     nn = None
 
+_ALPHABET = "abcdefghijklmnopqrstuvwxyz "
+
+_ID_COUNTER = itertools.count()
+
+# Mutation RNG: one Generator per thread, all spawned from a shared seed.
+# Creating them lazily avoids paying for OS entropy on every Meme.
+_seed_lock = threading.Lock()
+_seed_seq: Optional[np.random.SeedSequence] = None
+_seed_epoch = 0
+_thread_rng = threading.local()
+
+
+def seed(value: Optional[int] = None) -> None:
+    """Reseed the random generators used by :meth:`Meme.mutate`.
+
+    Each thread draws from its own generator spawned from this seed, so
+    results are reproducible as long as the mutations run on one thread
+    (e.g. ``MemeNetwork(max_workers=1)``).  Model memes mutate through
+    torch's own RNG; use :func:`torch.manual_seed` for those.
+    """
+    global _seed_seq, _seed_epoch
+    with _seed_lock:
+        _seed_seq = np.random.SeedSequence(value)
+        _seed_epoch += 1
+
+
+def _rng() -> np.random.Generator:
+    global _seed_seq
+    local = _thread_rng
+    if getattr(local, "epoch", None) != _seed_epoch:
+        with _seed_lock:
+            if _seed_seq is None:
+                _seed_seq = np.random.SeedSequence()
+            local.rng = np.random.default_rng(_seed_seq.spawn(1)[0])
+            local.epoch = _seed_epoch
+    return local.rng
+
+
+# content_type -> (required class, name used in the error message)
+_CONTENT_TYPES: Dict[str, Tuple[type, str]] = {
+    "code": (types.FunctionType, "function"),
+    "data": (dict, "dict"),
+    "text": (str, "str"),
+    "image": (Image.Image, "PIL.Image.Image"),
+}
+if nn is not None:
+    _CONTENT_TYPES["model"] = (nn.Module, "torch.nn.Module")
+
+MemeId = Union[int, uuid.UUID]
+
+
+class _Connections(dict):
+    """``dict`` that caches its ``{str(key): value}`` view until it is mutated.
+
+    The cache lives on the dict itself and is never copied or pickled, so
+    copies of a meme cannot inherit a stale view.
+    """
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self._str_view: Optional[Dict[str, Any]] = None
+
+    def str_view(self) -> Dict[str, Any]:
+        """Return ``{str(key): value}``; the result is shared and must not be modified."""
+        if self._str_view is None:
+            self._str_view = {str(k): v for k, v in self.items()}
+        return self._str_view
+
+    def __setitem__(self, key: Any, value: Any) -> None:
+        self._str_view = None
+        super().__setitem__(key, value)
+
+    def __delitem__(self, key: Any) -> None:
+        self._str_view = None
+        super().__delitem__(key)
+
+    def __ior__(self, other: Any) -> "_Connections":
+        self._str_view = None
+        return super().__ior__(other)
+
+    def clear(self) -> None:
+        self._str_view = None
+        super().clear()
+
+    def pop(self, *args: Any) -> Any:
+        self._str_view = None
+        return super().pop(*args)
+
+    def popitem(self) -> Any:
+        self._str_view = None
+        return super().popitem()
+
+    def setdefault(self, key: Any, default: Any = None) -> Any:
+        self._str_view = None
+        return super().setdefault(key, default)
+
+    def update(self, *args: Any, **kwargs: Any) -> None:
+        self._str_view = None
+        super().update(*args, **kwargs)
+
+    def copy(self) -> "_Connections":
+        return _Connections(self)
+
+    def __reduce__(self) -> Any:
+        return _Connections, (dict(self),)
+
 
 class Meme:
-    """Basic unit of information in MOS."""
+    """Basic unit of information in MOS.
+
+    Memes get process-unique integer ids by default; pass ``id_type="uuid"``
+    for the former random :class:`uuid.UUID` ids.
+    """
 
-    def __init__(self, content: Any, content_type: str = "code", metadata: Optional[Dict[str, Any]] = None):
-        self.id = uuid.uuid4()
+    def __init__(
+        self,
+        content: Any,
+        content_type: str = "code",
+        metadata: Optional[Dict[str, Any]] = None,
+        id_type: str = "int",
+        _validated: bool = False,
+    ):
+        if id_type == "int":
+            self.id: MemeId = next(_ID_COUNTER)
+        elif id_type == "uuid":
+            self.id = uuid.uuid4()
+        else:
+            raise ValueError(f"unknown id_type {id_type!r}")
+        self.id_type = id_type
         self.content = content
         self.content_type = content_type
         self.metadata = metadata or {"created": datetime.datetime.utcnow().isoformat()}
         self.fitness: float = 0.0
-        self.connections: Dict[uuid.UUID, float] = {}
-        self._validate_content()
+        self.connections = {}
+        if not _validated:
+            self._validate_content()
+
+    @property
+    def connections(self) -> Dict[MemeId, float]:
+        return self._connections
+
+    @connections.setter
+    def connections(self, value: Dict[MemeId, float]) -> None:
+        self._connections = value if isinstance(value, _Connections) else _Connections(value)
 
     def _validate_content(self) -> None:
-        if self.content_type == "code" and not isinstance(self.content, types.FunctionType):
-            raise TypeError("content must be function for type 'code'")
-        if self.content_type == "data" and not isinstance(self.content, dict):
-            raise TypeError("content must be dict for type 'data'")
-        if self.content_type == "text" and not isinstance(self.content, str):
-            raise TypeError("content must be str for type 'text'")
-        if self.content_type == "image" and not isinstance(self.content, Image.Image):
-            raise TypeError("content must be PIL.Image.Image for type 'image'")
-        if self.content_type == "model" and nn is not None and not isinstance(self.content, nn.Module):
-            raise TypeError("content must be torch.nn.Module for type 'model'")
+        expected = _CONTENT_TYPES.get(self.content_type)
+        if expected is not None and not isinstance(self.content, expected[0]):
+            raise TypeError(f"content must be {expected[1]} for type '{self.content_type}'")
 
     def execute(self, env: Optional[Any] = None) -> Any:
         if self.content_type == "code":
@@ -53,35 +183,60 @@ class Meme:
 
     def mutate(self) -> None:
         if self.content_type == "data":
-            for k, v in list(self.content.items()):
-                if isinstance(v, (int, float)):
-                    self.content[k] = v + np.random.uniform(-1, 1)
+            numeric_keys = [k for k, v in self.content.items() if isinstance(v, (int, float))]
+            deltas = _rng().uniform(-1, 1, size=len(numeric_keys))
+            for k, delta in zip(numeric_keys, deltas.tolist()):
+                self.content[k] = self.content[k] + delta
         elif self.content_type == "text":
             if self.content:
-                idx = np.random.randint(0, len(self.content))
-                new_char = np.random.choice(list("abcdefghijklmnopqrstuvwxyz "))
-                self.content = self.content[:idx] + new_char + self.content[idx + 1 :]
+                idx, char_idx = _rng().integers(0, (len(self.content), len(_ALPHABET)))
+                self.content = self.content[:idx] + _ALPHABET[char_idx] + self.content[idx + 1 :]
         elif self.content_type == "image":
-            arr = np.array(self.content)
-            noise = np.random.randint(-10, 10, arr.shape, dtype=np.int16)
-            arr = np.clip(arr + noise, 0, 255).astype(np.uint8)
-            self.content = Image.fromarray(arr)
+            arr = np.asarray(self.content)
+            # noise in [-10, 10) is drawn as uint8 in [0, 20) and the +10 offset
+            # is folded into the clip bounds, so only the result is freshly allocated
+            noise = _rng().integers(0, 20, arr.shape, dtype=np.uint8)
+            if arr.dtype == np.uint8:
+                work = _bufpool.get(arr.shape, np.int16)
+                try:
+                    np.add(arr, noise, out=work, dtype=np.int16)
+                    np.clip(work, 10, 265, out=work)
+                    out = np.empty(arr.shape, dtype=np.uint8)
+                    np.subtract(work, 10, out=out, casting="unsafe")
+                finally:
+                    _bufpool.put(work)
+            else:
+                # 1, I;16, I and F images: let NumPy promote so values clip
+                # to 0..255 instead of wrapping around
+                out = np.clip(arr + (noise.astype(np.int16) - 10), 0, 255).astype(np.uint8)
+            self.content = Image.fromarray(out)
         elif self.content_type == "model" and torch is not None:
             for param in self.content.parameters():
                 param.data += torch.randn_like(param) * 0.1
         # for code or unknown types do nothing
 
     def replicate(self) -> "Meme":
-        new_content = pickle.loads(pickle.dumps(self.content))
-        new_meme = Meme(new_content, self.content_type, self.metadata.copy())
+        if self.content_type in {"text", "code"}:
+            # str and function objects are immutable, the clone can share them
+            new_content = self.content
+        elif self.content_type == "image":
+            new_content = self.content.copy()
+        elif self.content_type == "model":
+            new_content = copy.deepcopy(self.content)
+        else:
+            # for plain dict payloads the C pickler beats the pure-Python deepcopy
+            new_content = pickle.loads(pickle.dumps(self.content))
+        # the source meme was validated on construction, so its copy is valid too
+        new_meme = Meme(new_content, self.content_type, self.metadata.copy(), id_type=self.id_type, _validated=True)
         new_meme.connections = self.connections.copy()
         return new_meme
 
     def to_dict(self) -> Dict[str, Any]:
         return {
-            "id": str(self.id),
+            "id": self.id if self.id_type == "int" else str(self.id),
             "content_type": self.content_type,
             "metadata": self.metadata,
             "fitness": self.fitness,
-            "connections": {str(k): v for k, v in self.connections.items()},
+            # copy of the cached view: skips the str() work without exposing the cache
+            "connections": dict(self._connections.str_view()),
         }
@@ -1,37 +1,100 @@
-import random
-from typing import Dict, Iterable, List, Optional
+import os
+import types
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Mapping, Optional
 
-from .meme import Meme
+import numpy as np
+
+from .meme import Meme, MemeId
+
+# content types whose mutation runs in NumPy/Torch with the GIL released;
+# everything else is pure Python and gains nothing from extra threads
+_PARALLEL_TYPES = frozenset({"image", "model"})
+
+
+def _replicate_and_mutate(meme: Meme) -> Meme:
+    clone = meme.replicate()
+    clone.mutate()
+    return clone
 
 
 class MemeNetwork:
-    """Collection of memes with simple evolutionary mechanics."""
+    """Collection of memes with simple evolutionary mechanics.
+
+    Memes are kept in an insertion-ordered id lookup; during :meth:`evolve`
+    the per-generation fitness scores live in a ``float32`` array aligned
+    with a snapshot of that order, so scoring and selection run as single
+    NumPy calls.
 
-    def __init__(self) -> None:
-        self.memes: Dict[str, Meme] = {}
+    Image and model survivors are replicated on a thread pool owned by the
+    network and created on first use; call :meth:`close` to release it.
+    """
+
+    def __init__(self, max_workers: Optional[int] = None) -> None:
+        self._by_id: Dict[MemeId, Meme] = {}
+        self._memes_view = types.MappingProxyType(self._by_id)
+        self._fitness = np.empty(0, dtype=np.float32)
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._rng = np.random.default_rng()
+
+    @property
+    def memes(self) -> Mapping[MemeId, Meme]:
+        """Live read-only ``id -> meme`` view; use :meth:`add_meme`/:meth:`remove_meme` to modify."""
+        return self._memes_view
 
     def add_meme(self, meme: Meme) -> None:
-        self.memes[str(meme.id)] = meme
+        self._by_id[meme.id] = meme
 
-    def remove_meme(self, meme_id: str) -> None:
-        self.memes.pop(meme_id, None)
+    def remove_meme(self, meme_id: MemeId) -> None:
+        self._by_id.pop(meme_id, None)
 
     def __iter__(self) -> Iterable[Meme]:
-        return iter(self.memes.values())
+        return iter(self._by_id.values())
+
+    def __len__(self) -> int:
+        return len(self._by_id)
 
     def evolve(self) -> None:
-        if not self.memes:
+        n = len(self._by_id)
+        if not n:
             return
-        for meme in self.memes.values():
-            meme.fitness = random.random()
-        sorted_memes: List[Meme] = sorted(self.memes.values(), key=lambda m: m.fitness, reverse=True)
-        survivors = sorted_memes[: max(1, len(sorted_memes) // 2)]
-        new_generation: List[Meme] = []
-        for meme in survivors:
-            clone = meme.replicate()
-            clone.mutate()
-            new_generation.append(clone)
-        self.memes = {str(m.id): m for m in survivors + new_generation}
-
-    def get(self, meme_id: str) -> Optional[Meme]:
-        return self.memes.get(meme_id)
+        # snapshot the order once so indices line up with ``_fitness``
+        objects = list(self._by_id.values())
+        # the population size stays roughly constant across generations,
+        # so the fitness buffer is normally reused as-is
+        if self._fitness.shape[0] != n:
+            self._fitness = np.empty(n, dtype=np.float32)
+        self._rng.random(dtype=np.float32, out=self._fitness)
+        k = max(1, n // 2)
+        # partition ascending around n - k: the k fittest end up in the tail,
+        # without the temporary a negated copy of the scores would need
+        top = np.argpartition(self._fitness, n - k)[n - k :]
+        survivors: List[Meme] = []
+        for i in top.tolist():
+            meme = objects[i]
+            meme.fitness = float(self._fitness[i])
+            survivors.append(meme)
+        parallel = [i for i, m in enumerate(survivors) if m.content_type in _PARALLEL_TYPES]
+        if self.max_workers > 1 and len(parallel) > 1:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers)
+            futures = {i: self._executor.submit(_replicate_and_mutate, survivors[i]) for i in parallel}
+            new_generation = [
+                futures[i].result() if i in futures else _replicate_and_mutate(m) for i, m in enumerate(survivors)
+            ]
+        else:
+            new_generation = [_replicate_and_mutate(m) for m in survivors]
+        # refill in place so views handed out by ``memes`` stay current
+        self._by_id.clear()
+        self._by_id.update((m.id, m) for m in survivors)
+        self._by_id.update((m.id, m) for m in new_generation)
+
+    def get(self, meme_id: MemeId) -> Optional[Meme]:
+        return self._by_id.get(meme_id)
+
+    def close(self) -> None:
+        """Shut down the replication thread pool, if one was started."""
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None